@@ -1,22 +1,25 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, BackgroundTasks, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, validator, ValidationError
-from typing import List, Optional, Dict, Any
-import uuid
+from typing import List, Optional, Dict, Any, Tuple
+from uuid6 import uuid7
 from datetime import datetime, timedelta
 from enum import Enum
 import jwt
 from passlib.context import CryptContext
 import json
+import orjson
 import asyncio
 from collections import defaultdict
 import qrcode
@@ -35,7 +38,8 @@ db = client[os.environ['DB_NAME']]
 app = FastAPI(
     title="Prescription Management App (PMA)",
     description="A comprehensive prescription management system powered by Innovating Chaos",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Create a router with the /api prefix
@@ -44,10 +48,21 @@ api_router = APIRouter(prefix="/api")
 # Security setup
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cheap bcrypt cost for test runs; only honoured when the server itself runs with ENV=test
+TEST_MODE = os.environ.get("ENV") == "test"
+TEST_KDF_HEADER = "X-Test-KDF-Cost"
+test_pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Fields returned when streaming raw prescription documents (Mongo's ObjectId is not serializable)
+PRESCRIPTION_PROJECTION = {"_id": 0}
+
+def generate_id() -> str:
+    """Generate a time-ordered UUIDv7 string so new documents append to the id indexes"""
+    return str(uuid7())
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -78,6 +93,54 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# Request coalescing for expensive read endpoints
+class LeaderCancelled(Exception):
+    """Set on a shared SingleFlight future when the leading call is cancelled, so waiters retry"""
+
+class SingleFlight:
+    def __init__(self):
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        """Run fn() once per key; concurrent callers with the same key await the same result"""
+        while True:
+            future = self.inflight.get(key)
+            if future is None:
+                break
+            try:
+                # Shielded so a cancelled waiter (e.g. client disconnect) doesn't cancel the shared future
+                return await asyncio.shield(future)
+            except LeaderCancelled:
+                # The leader's request went away; retry, possibly becoming the new leader
+                continue
+        
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Only this request was cancelled; don't forward the cancellation to the waiters
+            self._fail(future, LeaderCancelled())
+            raise
+        except Exception as e:
+            self._fail(future, e)
+            raise
+        else:
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: BaseException):
+        if not future.done():
+            future.set_exception(error)
+            future.exception()  # Mark as retrieved so a lone caller doesn't log "never retrieved"
+
+single_flight = SingleFlight()
+
 # Global exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -157,7 +220,7 @@ class AuditAction(str, Enum):
 
 # Enhanced Models
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     email: str
     password_hash: str
     full_name: str
@@ -179,7 +242,7 @@ class User(BaseModel):
     last_login: Optional[datetime] = None
 
 class Prescription(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     patient_id: str
     patient_nhs_number: Optional[str] = None
     gp_id: Optional[str] = None
@@ -218,7 +281,7 @@ class Prescription(BaseModel):
         return v
 
 class Delegation(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     patient_id: str
     delegate_user_id: str
     delegate_name: str
@@ -237,7 +300,7 @@ class Delegation(BaseModel):
     is_active: bool = True
 
 class Notification(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     user_id: str
     notification_type: NotificationType
     title: str
@@ -252,7 +315,7 @@ class Notification(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
 class AuditLog(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=generate_id)
     user_id: str
     action: AuditAction
     resource_type: str
@@ -302,6 +365,10 @@ class PrescriptionCreate(BaseModel):
     priority: str = "normal"
     max_repeats: int = 0
 
+class PrescriptionDetails(Prescription):
+    patient: Optional[Dict[str, Any]] = None  # Joined from users: id, full_name, nhs_number
+    gp: Optional[Dict[str, Any]] = None  # Joined from users: id, full_name, gp_license_number
+
 class PrescriptionUpdate(BaseModel):
     status: Optional[PrescriptionStatus] = None
     gp_notes: Optional[str] = None
@@ -311,6 +378,10 @@ class PrescriptionUpdate(BaseModel):
     adverse_reactions: Optional[List[str]] = None
     contraindications: Optional[List[str]] = None
 
+class PrescriptionPatch(BaseModel):
+    expected_status: PrescriptionStatus  # Status the client last saw; the write only applies if it still matches
+    changes: PrescriptionUpdate
+
 class DelegationCreate(BaseModel):
     delegate_user_id: str
     delegate_name: str
@@ -330,7 +401,9 @@ class PharmacyNomination(BaseModel):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
+def get_password_hash(password, low_cost: bool = False):
+    if low_cost and TEST_MODE:
+        return test_pwd_context.hash(password)
     return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -343,14 +416,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def get_request_time() -> datetime:
+    """Single UTC timestamp shared by every write made while handling a request"""
+    return datetime.utcnow()
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await get_user_from_token(credentials.credentials)
+
+async def get_user_from_token(token: str) -> User:
+    """Resolve a bearer token to its active user, raising 401 if it is invalid"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -485,16 +566,17 @@ async def create_audit_log(user_id: str, action: AuditAction, resource_type: str
     await db.audit_logs.insert_one(audit_log.dict())
 
 async def simple_create_audit_log(user_id: str, action: str, resource_type: str, 
-                                 resource_id: str, details: Dict[str, Any]):
+                                 resource_id: str, details: Dict[str, Any],
+                                 timestamp: Optional[datetime] = None):
     """Simple audit log creation with string action"""
     audit_data = {
-        "id": str(uuid.uuid4()),
+        "id": generate_id(),
         "user_id": user_id,
         "action": action,
         "resource_type": resource_type,
         "resource_id": resource_id,
         "details": details,
-        "timestamp": datetime.utcnow(),
+        "timestamp": timestamp or datetime.utcnow(),
         "gdpr_category": "healthcare_data"
     }
     await db.audit_logs.insert_one(audit_data)
@@ -521,29 +603,34 @@ async def send_notification(user_id: str, notification_type: NotificationType,
     )
 
 async def simple_send_notification(user_id: str, notification_type: str, 
-                                  title: str, message: str, prescription_id: Optional[str] = None):
+                                  title: str, message: str, prescription_id: Optional[str] = None,
+                                  created_at: Optional[datetime] = None):
     """Simple notification creation with string notification type"""
     notification_data = {
-        "id": str(uuid.uuid4()),
+        "id": generate_id(),
         "user_id": user_id,
         "notification_type": notification_type,
         "title": title,
         "message": message,
         "prescription_id": prescription_id,
-        "created_at": datetime.utcnow(),
+        "created_at": created_at or datetime.utcnow(),
         "is_read": False,
         "priority": "normal"
     }
     await db.notifications.insert_one(notification_data)
-    
-    # Send real-time notification via WebSocket
+    await push_notification(notification_data)
+
+async def push_notification(notification_data: Dict[str, Any]):
+    """Send a stored notification to the user's open WebSocket connections (safely)"""
+    # insert_one adds Mongo's ObjectId as _id, which is not JSON serializable
+    payload = {key: value for key, value in notification_data.items() if key != "_id"}
     try:
         await manager.send_personal_message(
-            json.dumps({
+            orjson.dumps({
                 "type": "notification",
-                "data": notification_data
-            }),
-            user_id
+                "data": payload
+            }).decode(),
+            notification_data["user_id"]
         )
     except Exception as ws_error:
         logger.warning(f"WebSocket notification failed: {ws_error}")
@@ -551,7 +638,7 @@ async def simple_send_notification(user_id: str, notification_type: str,
 # WebSocket endpoint
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
-    connection_id = str(uuid.uuid4())
+    connection_id = generate_id()
     await manager.connect(websocket, user_id, connection_id)
     try:
         while True:
@@ -561,9 +648,30 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     except WebSocketDisconnect:
         manager.disconnect(connection_id, user_id)
 
+@api_router.websocket("/ws/notifications")
+async def notifications_websocket(websocket: WebSocket):
+    """Push the authenticated user's notifications as they are created (Authorization: Bearer <token>)"""
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    try:
+        if scheme.lower() != "bearer" or not token:
+            raise HTTPException(status_code=401, detail="Missing bearer token")
+        user = await get_user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    connection_id = generate_id()
+    await manager.connect(websocket, user.id, connection_id)
+    try:
+        while True:
+            # Server-push only; incoming frames just keep the connection open
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        manager.disconnect(connection_id, user.id)
+
 # Enhanced Authentication routes
 @api_router.post("/auth/register", response_model=Token)
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, request: Request, now: datetime = Depends(get_request_time)):
     try:
         # Check if user already exists
         existing_user = await db.users.find_one({"email": user_data.email})
@@ -584,9 +692,10 @@ async def register(user_data: UserCreate):
                 parsed_date_of_birth = None
         
         # Create new user
-        password_hash = get_password_hash(user_data.password)
+        low_kdf_cost = request.headers.get(TEST_KDF_HEADER, "").lower() == "low"
+        password_hash = get_password_hash(user_data.password, low_cost=low_kdf_cost)
         user_dict = {
-            "id": str(uuid.uuid4()),
+            "id": generate_id(),
             "email": user_data.email,
             "password_hash": password_hash,
             "full_name": user_data.full_name,
@@ -598,8 +707,8 @@ async def register(user_data: UserCreate):
             "ods_code": user_data.ods_code,
             "accessibility_requirements": user_data.accessibility_requirements,
             "gdpr_consent": user_data.gdpr_consent,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
+            "created_at": now,
+            "updated_at": now,
             "is_active": True
         }
         
@@ -611,14 +720,14 @@ async def register(user_data: UserCreate):
             user_dict["date_of_birth"] = parsed_date_of_birth
             
         if user_data.gdpr_consent:
-            user_dict["gdpr_consent_date"] = datetime.utcnow()
+            user_dict["gdpr_consent_date"] = now
         
         await db.users.insert_one(user_dict)
         
         # Create audit log (safely)
         try:
             await simple_create_audit_log(user_dict["id"], "CREATE", "user", user_dict["id"], 
-                                        {"action": "user_registration", "role": user_data.role})
+                                        {"action": "user_registration", "role": user_data.role}, timestamp=now)
         except Exception as audit_error:
             logger.warning(f"Audit log creation failed: {audit_error}")
         
@@ -646,7 +755,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=500, detail="Registration failed. Please try again.")
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin):
+async def login(user_data: UserLogin, now: datetime = Depends(get_request_time)):
     # Find user
     user = await db.users.find_one({"email": user_data.email})
     if not user:
@@ -659,13 +768,13 @@ async def login(user_data: UserLogin):
     # Update last login
     await db.users.update_one(
         {"id": user["id"]}, 
-        {"$set": {"last_login": datetime.utcnow()}}
+        {"$set": {"last_login": now}}
     )
     
     # Create audit log (safely)
     try:
         await simple_create_audit_log(user["id"], "LOGIN", "user", user["id"], 
-                                    {"action": "user_login"})
+                                    {"action": "user_login"}, timestamp=now)
     except Exception as audit_error:
         logger.warning(f"Audit log creation failed: {audit_error}")
     
@@ -690,18 +799,20 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 @api_router.put("/users/me")
-async def update_user_profile(user_updates: dict, current_user: User = Depends(get_current_user)):
+async def update_user_profile(user_updates: dict, current_user: User = Depends(get_current_user),
+                              now: datetime = Depends(get_request_time)):
     # Remove sensitive fields
     protected_fields = {"id", "password_hash", "created_at", "role"}
     user_updates = {k: v for k, v in user_updates.items() if k not in protected_fields}
-    user_updates["updated_at"] = datetime.utcnow()
+    user_updates["updated_at"] = now
     
     await db.users.update_one({"id": current_user.id}, {"$set": user_updates})
     
     # Create audit log (safely)
     try:
         await simple_create_audit_log(current_user.id, "UPDATE", "user", current_user.id, 
-                                    {"action": "profile_update", "fields": list(user_updates.keys())})
+                                    {"action": "profile_update", "fields": list(user_updates.keys())},
+                                    timestamp=now)
     except Exception as audit_error:
         logger.warning(f"Audit log creation failed: {audit_error}")
     
@@ -739,7 +850,8 @@ async def nominate_pharmacy(nomination: PharmacyNomination, current_user: User =
 # Enhanced Prescription routes
 @api_router.post("/prescriptions", response_model=Prescription)
 async def create_prescription(prescription_data: PrescriptionCreate, 
-                             current_user: User = Depends(get_current_user)):
+                             current_user: User = Depends(get_current_user),
+                             now: datetime = Depends(get_request_time)):
     try:
         if current_user.role != UserRole.PATIENT:
             raise HTTPException(status_code=403, detail="Only patients can create prescriptions")
@@ -747,11 +859,11 @@ async def create_prescription(prescription_data: PrescriptionCreate,
         # Generate collection PIN and QR code
         collection_pin = generate_collection_pin()
         qr_data = f"prescription:{prescription_data.medication_name}:{collection_pin}"
-        qr_code = generate_qr_code(qr_data)
+        qr_code = await asyncio.to_thread(generate_qr_code, qr_data)
         
         # Create prescription dictionary for database
         prescription_dict = {
-            "id": str(uuid.uuid4()),
+            "id": generate_id(),
             "patient_id": current_user.id,
             "patient_nhs_number": current_user.nhs_number,
             "medication_name": prescription_data.medication_name,
@@ -767,8 +879,8 @@ async def create_prescription(prescription_data: PrescriptionCreate,
             "collection_pin": collection_pin,
             "qr_code": qr_code,
             "status": PrescriptionStatus.REQUESTED,
-            "requested_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(days=28),
+            "requested_at": now,
+            "expires_at": now + timedelta(days=28),
             "repeat_count": 0
         }
         
@@ -783,7 +895,7 @@ async def create_prescription(prescription_data: PrescriptionCreate,
                 "resource_type": "prescription",
                 "resource_id": prescription_dict["id"],
                 "details": {"action": "prescription_created", "medication": prescription_dict["medication_name"]},
-                "timestamp": datetime.utcnow()
+                "timestamp": now
             }
             await db.audit_logs.insert_one(audit_data)
         except Exception as audit_error:
@@ -792,16 +904,17 @@ async def create_prescription(prescription_data: PrescriptionCreate,
         # Send notification (safely)
         try:
             notification_data = {
-                "id": str(uuid.uuid4()),
+                "id": generate_id(),
                 "user_id": current_user.id,
                 "notification_type": NotificationType.PRESCRIPTION_APPROVED,
                 "title": "Prescription Request Submitted",
                 "message": f"Your prescription for {prescription_dict['medication_name']} has been submitted for GP approval.",
                 "prescription_id": prescription_dict["id"],
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "is_read": False
             }
             await db.notifications.insert_one(notification_data)
+            await push_notification(notification_data)
         except Exception as notif_error:
             logger.warning(f"Notification creation failed: {notif_error}")
         
@@ -814,30 +927,56 @@ async def create_prescription(prescription_data: PrescriptionCreate,
         logger.error(f"Error creating prescription: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create prescription. Please try again.")
 
-@api_router.get("/prescriptions", response_model=List[Prescription])
+@api_router.get("/prescriptions")
 async def get_prescriptions(current_user: User = Depends(get_current_user)):
     if current_user.role == UserRole.PATIENT:
-        prescriptions = await db.prescriptions.find({"patient_id": current_user.id}).to_list(100)
+        query = {"patient_id": current_user.id}
     elif current_user.role == UserRole.GP:
-        prescriptions = await db.prescriptions.find({
-            "status": {"$in": [PrescriptionStatus.REQUESTED]}
-        }).to_list(100)
+        query = {"status": {"$in": [PrescriptionStatus.REQUESTED]}}
     elif current_user.role == UserRole.PHARMACY:
-        prescriptions = await db.prescriptions.find({
-            "status": {"$in": [PrescriptionStatus.GP_APPROVED, PrescriptionStatus.SENT_TO_PHARMACY]}
-        }).to_list(100)
+        query = {"status": {"$in": [PrescriptionStatus.GP_APPROVED, PrescriptionStatus.SENT_TO_PHARMACY]}}
     else:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    return [Prescription(**prescription) for prescription in prescriptions]
+    async def stream_prescriptions():
+        """Serialize each document as it arrives from the cursor"""
+        yield b"["
+        first = True
+        async for prescription in db.prescriptions.find(query, projection=PRESCRIPTION_PROJECTION).limit(100):
+            yield (b"" if first else b",") + orjson.dumps(prescription)
+            first = False
+        yield b"]"
+    
+    return StreamingResponse(stream_prescriptions(), media_type="application/json")
 
-@api_router.get("/prescriptions/{prescription_id}", response_model=Prescription)
+@api_router.get("/prescriptions/{prescription_id}", response_model=PrescriptionDetails)
 async def get_prescription(prescription_id: str, current_user: User = Depends(get_current_user)):
-    prescription = await db.prescriptions.find_one({"id": prescription_id})
-    if not prescription:
+    # Join patient and GP details in the same round-trip
+    pipeline = [
+        {"$match": {"id": prescription_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "localField": "patient_id",
+            "foreignField": "id",
+            "as": "patient",
+            "pipeline": [{"$project": {"_id": 0, "id": 1, "full_name": 1, "nhs_number": 1}}]
+        }},
+        {"$lookup": {
+            "from": "users",
+            "localField": "gp_id",
+            "foreignField": "id",
+            "as": "gp",
+            "pipeline": [{"$project": {"_id": 0, "id": 1, "full_name": 1, "gp_license_number": 1}}]
+        }},
+        {"$unwind": {"path": "$patient", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$gp", "preserveNullAndEmptyArrays": True}}
+    ]
+    prescriptions = await db.prescriptions.aggregate(pipeline).to_list(1)
+    if not prescriptions:
         raise HTTPException(status_code=404, detail="Prescription not found")
     
-    prescription_obj = Prescription(**prescription)
+    prescription_obj = PrescriptionDetails(**prescriptions[0])
     
     # Check access permissions
     if current_user.role == UserRole.PATIENT and prescription_obj.patient_id != current_user.id:
@@ -852,64 +991,73 @@ async def get_prescription(prescription_id: str, current_user: User = Depends(ge
     
     return prescription_obj
 
-@api_router.put("/prescriptions/{prescription_id}", response_model=Prescription)
-async def update_prescription(prescription_id: str, prescription_data: PrescriptionUpdate, 
-                             current_user: User = Depends(get_current_user)):
-    prescription = await db.prescriptions.find_one({"id": prescription_id})
-    if not prescription:
-        raise HTTPException(status_code=404, detail="Prescription not found")
-    
-    prescription_obj = Prescription(**prescription)
-    update_data = {}
-    
-    # Handle status updates based on user role
-    if current_user.role == UserRole.GP and prescription_data.status == PrescriptionStatus.GP_APPROVED:
+# Statuses a prescription must currently be in for each role-driven status change to be legal
+TRANSITION_SOURCES: Dict[PrescriptionStatus, Tuple[PrescriptionStatus, ...]] = {
+    PrescriptionStatus.GP_APPROVED: (PrescriptionStatus.REQUESTED,),
+    PrescriptionStatus.DISPENSED: (PrescriptionStatus.GP_APPROVED, PrescriptionStatus.SENT_TO_PHARMACY),
+}
+
+def status_update_for_role(prescription_obj: Prescription, prescription_data: PrescriptionUpdate,
+                           user: User, now: datetime) -> Tuple[Dict[str, Any], Tuple[str, str, str]]:
+    """Build the $set for a role's status change plus the (type, title, message) patient notification"""
+    if user.role == UserRole.GP and prescription_data.status == PrescriptionStatus.GP_APPROVED:
         update_data = {
             "status": PrescriptionStatus.GP_APPROVED,
-            "gp_id": current_user.id,
-            "approved_at": datetime.utcnow(),
+            "gp_id": user.id,
+            "approved_at": now,
             "gp_notes": prescription_data.gp_notes
         }
-        
-        # Send notification to patient (safely)
-        try:
-            await simple_send_notification(
-                prescription_obj.patient_id,
-                "PRESCRIPTION_APPROVED",
-                "Prescription Approved",
-                f"Your prescription for {prescription_obj.medication_name} has been approved by your GP."
-            )
-        except Exception as notif_error:
-            logger.warning(f"Notification creation failed: {notif_error}")
-        
-    elif current_user.role == UserRole.PHARMACY and prescription_data.status == PrescriptionStatus.DISPENSED:
+        notification = (
+            "PRESCRIPTION_APPROVED",
+            "Prescription Approved",
+            f"Your prescription for {prescription_obj.medication_name} has been approved by your GP."
+        )
+    elif user.role == UserRole.PHARMACY and prescription_data.status == PrescriptionStatus.DISPENSED:
         update_data = {
             "status": PrescriptionStatus.READY_FOR_COLLECTION,
-            "pharmacy_id": current_user.id,
-            "dispensed_at": datetime.utcnow(),
+            "pharmacy_id": user.id,
+            "dispensed_at": now,
             "pharmacy_notes": prescription_data.pharmacy_notes
         }
-        
-        # Send notification to patient (safely)
-        try:
-            await simple_send_notification(
-                prescription_obj.patient_id,
-                "PRESCRIPTION_READY",
-                "Prescription Ready for Collection",
-                f"Your prescription for {prescription_obj.medication_name} is ready for collection."
-            )
-        except Exception as notif_error:
-            logger.warning(f"Notification creation failed: {notif_error}")
-        
+        notification = (
+            "PRESCRIPTION_READY",
+            "Prescription Ready for Collection",
+            f"Your prescription for {prescription_obj.medication_name} is ready for collection."
+        )
     else:
         raise HTTPException(status_code=403, detail="Invalid status update for your role")
     
+    return update_data, notification
+
+async def send_status_notification(prescription_obj: Prescription, notification: Tuple[str, str, str],
+                                   now: datetime):
+    """Notify the patient about a status change (safely)"""
+    notification_type, title, message = notification
+    try:
+        await simple_send_notification(prescription_obj.patient_id, notification_type, title, message,
+                                       created_at=now)
+    except Exception as notif_error:
+        logger.warning(f"Notification creation failed: {notif_error}")
+
+@api_router.put("/prescriptions/{prescription_id}", response_model=Prescription)
+async def update_prescription(prescription_id: str, prescription_data: PrescriptionUpdate, 
+                             current_user: User = Depends(get_current_user),
+                             now: datetime = Depends(get_request_time)):
+    prescription = await db.prescriptions.find_one({"id": prescription_id})
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    prescription_obj = Prescription(**prescription)
+    update_data, notification = status_update_for_role(prescription_obj, prescription_data, current_user, now)
+    await send_status_notification(prescription_obj, notification, now)
+    
     await db.prescriptions.update_one({"id": prescription_id}, {"$set": update_data})
     
     # Create audit log (safely)
     try:
         await simple_create_audit_log(current_user.id, "UPDATE", "prescription", prescription_id, 
-                                    {"action": "status_update", "new_status": str(prescription_data.status)})
+                                    {"action": "status_update", "new_status": str(prescription_data.status)},
+                                    timestamp=now)
     except Exception as audit_error:
         logger.warning(f"Audit log creation failed: {audit_error}")
     
@@ -917,17 +1065,62 @@ async def update_prescription(prescription_id: str, prescription_data: Prescript
     updated_prescription = await db.prescriptions.find_one({"id": prescription_id})
     return Prescription(**updated_prescription)
 
+@api_router.patch("/prescriptions/{prescription_id}", response_model=Prescription)
+async def patch_prescription(prescription_id: str, patch: PrescriptionPatch,
+                             current_user: User = Depends(get_current_user),
+                             now: datetime = Depends(get_request_time)):
+    """Apply one status change only if the prescription is still in the expected status, returning the result"""
+    prescription = await db.prescriptions.find_one({"id": prescription_id}, PRESCRIPTION_PROJECTION)
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    prescription_obj = Prescription(**prescription)
+    update_data, notification = status_update_for_role(prescription_obj, patch.changes, current_user, now)
+    
+    # The role rules pass, so the target status is one of TRANSITION_SOURCES' keys
+    if patch.expected_status not in TRANSITION_SOURCES[patch.changes.status]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot move a prescription from '{patch.expected_status.value}' to '{patch.changes.status.value}'"
+        )
+    
+    # Compare-and-set on status, so the write and the updated document come back in one round trip
+    updated_prescription = await db.prescriptions.find_one_and_update(
+        {"id": prescription_id, "status": patch.expected_status},
+        {"$set": update_data},
+        projection=PRESCRIPTION_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_prescription is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Prescription is no longer in status '{patch.expected_status.value}'"
+        )
+    
+    await send_status_notification(prescription_obj, notification, now)
+    
+    # Create audit log (safely)
+    try:
+        await simple_create_audit_log(current_user.id, "UPDATE", "prescription", prescription_id, 
+                                    {"action": "status_update", "new_status": str(patch.changes.status)},
+                                    timestamp=now)
+    except Exception as audit_error:
+        logger.warning(f"Audit log creation failed: {audit_error}")
+    
+    return Prescription(**updated_prescription)
+
 # Enhanced Delegation routes
 @api_router.post("/delegations", response_model=Delegation)
 async def create_delegation(delegation_data: DelegationCreate, 
-                           current_user: User = Depends(get_current_user)):
+                           current_user: User = Depends(get_current_user),
+                           now: datetime = Depends(get_request_time)):
     if current_user.role != UserRole.PATIENT:
         raise HTTPException(status_code=403, detail="Only patients can create delegations")
     
     # Generate PIN and QR code for delegation
     pin_code = generate_collection_pin()
     qr_data = f"delegation:{current_user.id}:{delegation_data.delegate_user_id}:{pin_code}"
-    qr_code = generate_qr_code(qr_data)
+    qr_code = await asyncio.to_thread(generate_qr_code, qr_data)
     
     delegation = Delegation(
         patient_id=current_user.id,
@@ -936,9 +1129,10 @@ async def create_delegation(delegation_data: DelegationCreate,
         delegate_phone=delegation_data.delegate_phone,
         delegate_relationship=delegation_data.delegate_relationship,
         permissions=delegation_data.permissions,
-        expires_at=delegation_data.expires_at or (datetime.utcnow() + timedelta(days=30)),
+        created_at=now,
+        expires_at=delegation_data.expires_at or (now + timedelta(days=30)),
         gdpr_consent=delegation_data.gdpr_consent,
-        gdpr_consent_date=datetime.utcnow() if delegation_data.gdpr_consent else None,
+        gdpr_consent_date=now if delegation_data.gdpr_consent else None,
         pin_code=pin_code,
         qr_code=qr_code
     )
@@ -948,7 +1142,8 @@ async def create_delegation(delegation_data: DelegationCreate,
     # Create audit log (safely)
     try:
         await simple_create_audit_log(current_user.id, "CREATE", "delegation", delegation.id, 
-                                    {"action": "delegation_created", "delegate": delegation.delegate_name})
+                                    {"action": "delegation_created", "delegate": delegation.delegate_name},
+                                    timestamp=now)
     except Exception as audit_error:
         logger.warning(f"Audit log creation failed: {audit_error}")
     
@@ -978,7 +1173,8 @@ async def get_delegations(current_user: User = Depends(get_current_user)):
     return [Delegation(**delegation) for delegation in delegations]
 
 @api_router.put("/delegations/{delegation_id}/approve")
-async def approve_delegation(delegation_id: str, current_user: User = Depends(get_current_user)):
+async def approve_delegation(delegation_id: str, current_user: User = Depends(get_current_user),
+                             now: datetime = Depends(get_request_time)):
     delegation = await db.delegations.find_one({"id": delegation_id})
     if not delegation:
         raise HTTPException(status_code=404, detail="Delegation not found")
@@ -988,7 +1184,7 @@ async def approve_delegation(delegation_id: str, current_user: User = Depends(ge
     
     update_data = {
         "status": DelegationStatus.APPROVED,
-        "approved_at": datetime.utcnow()
+        "approved_at": now
     }
     
     await db.delegations.update_one({"id": delegation_id}, {"$set": update_data})
@@ -996,7 +1192,7 @@ async def approve_delegation(delegation_id: str, current_user: User = Depends(ge
     # Create audit log (safely)
     try:
         await simple_create_audit_log(current_user.id, "APPROVE", "delegation", delegation_id, 
-                                    {"action": "delegation_approved"})
+                                    {"action": "delegation_approved"}, timestamp=now)
     except Exception as audit_error:
         logger.warning(f"Audit log creation failed: {audit_error}")
     
@@ -1022,7 +1218,10 @@ async def get_analytics_dashboard(current_user: User = Depends(get_current_user)
     if current_user.role not in [UserRole.GP, UserRole.PHARMACY, UserRole.ADMIN]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get prescription statistics
+    return await single_flight.do("analytics:dashboard", compute_dashboard_stats)
+
+async def compute_dashboard_stats() -> Dict[str, Any]:
+    """Aggregate prescription statistics for the analytics dashboard"""
     total_prescriptions = await db.prescriptions.count_documents({})
     pending_prescriptions = await db.prescriptions.count_documents({"status": PrescriptionStatus.REQUESTED})
     approved_prescriptions = await db.prescriptions.count_documents({"status": PrescriptionStatus.GP_APPROVED})
@@ -1055,6 +1254,9 @@ async def health_check():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compress larger JSON payloads (prescription and notification lists)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Enhanced CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -1074,15 +1276,19 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     # Create database indexes for better performance
+    await db.users.create_index("id", unique=True)
     await db.users.create_index("email", unique=True)
     await db.users.create_index("nhs_number")
+    await db.prescriptions.create_index("id", unique=True)
     await db.prescriptions.create_index("patient_id")
     await db.prescriptions.create_index("status")
     await db.prescriptions.create_index("expires_at")
     await db.prescriptions.create_index("requested_at")
     await db.prescriptions.create_index("approved_at")
+    await db.delegations.create_index("id", unique=True)
     await db.delegations.create_index("patient_id")
     await db.delegations.create_index("delegate_user_id")
+    await db.notifications.create_index("id", unique=True)
     await db.notifications.create_index("user_id")
     await db.audit_logs.create_index("user_id")
     await db.audit_logs.create_index("timestamp")
@@ -1105,4 +1311,15 @@ async def reminder_background_task():
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
-    logger.info("Database connection closed")
\ No newline at end of file
+    logger.info("Database connection closed")
+
+if __name__ == "__main__":
+    import uvicorn
+    # uvicorn picks uvloop/httptools automatically when they are installed
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        timeout_keep_alive=30
+    )
@@ -4,63 +4,109 @@ Comprehensive Backend Testing for Enhanced NHS-Integrated Prescription Managemen
 Tests enhanced authentication, advanced prescription workflow, notifications, analytics, and compliance features
 """
 
+import argparse
 import requests
-import json
+from urllib3.util.retry import Retry
+import orjson
 import time
 import websocket
 import threading
-from datetime import datetime, timedelta
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List
 
+from backend_test_support import SharedTLSAdapter, TesterMixin
+
 # Configuration
 BASE_URL = "https://ab6009e8-2e3e-4cd0-b3b8-a452a86b19f9.preview.emergentagent.com/api"
 WS_URL = "wss://f6b00ae1-f513-4038-91eb-ddf68c5cea24.preview.emergentagent.com/ws"
 TIMEOUT = 30
 
-class BackendTester:
+class BackendTester(TesterMixin):
     def __init__(self):
         self.base_url = BASE_URL
         self.session = requests.Session()
-        self.session.timeout = TIMEOUT
+        # Size the pool for concurrent tests so sockets are reused rather than discarded. Once status
+        # retries run out the last 5xx response is returned, since the tests assert on its status code
+        adapter = SharedTLSAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                              raise_on_status=False)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self._method_map = {
+            "GET": self.session.get,
+            "POST": self.session.post,
+            "PUT": self.session.put,
+            "DELETE": self.session.delete
+        }
         self.tokens = {}  # Store tokens for different users
         self.users = {}   # Store user data
         self.prescriptions = {}  # Store prescription data
         self.delegations = {}    # Store delegation data
+        self._state_lock = threading.Lock()  # Guards tokens/users when tests run requests concurrently
+        self._prefetched_logins: Dict[str, requests.Response] = {}  # Logins chained behind registration, by role
+        self._log_lock = threading.Lock()  # Keeps lines intact when tests log from several threads
+        self._last_ts_sec = 0
+        self._last_ts_str = ""
+        self._header_cache: Dict[Optional[str], Dict[str, str]] = {}  # Per-token request headers, built once
+        self.debug = False  # When set, every response is logged at DEBUG level (see --debug)
+        
+        # Warm up DNS, TCP and TLS so the first real test reuses a pooled keep-alive socket. The probe
+        # goes through the same pool but without retries, so an unreachable host costs one attempt
+        retries, adapter.max_retries = adapter.max_retries, Retry(0, read=False)
+        try:
+            self.session.head(f"{self.base_url}/health", timeout=5)
+        except requests.exceptions.RequestException:
+            pass
+        finally:
+            adapter.max_retries = retries
         
     def log(self, message: str, level: str = "INFO"):
         """Log test messages with timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        with self._log_lock:
+            # Timestamps have second resolution, so only reformat when the second changes
+            sec = int(time.time())
+            if sec != self._last_ts_sec:
+                self._last_ts_str = time.strftime("%H:%M:%S", time.localtime(sec))
+                self._last_ts_sec = sec
+            sys.stdout.write(f"[{self._last_ts_str}] {level}: {message}\n")
         
     def make_request(self, method: str, endpoint: str, data: Dict = None, 
                     headers: Dict = None, token: str = None) -> requests.Response:
         """Make HTTP request with proper error handling"""
         url = f"{self.base_url}{endpoint}"
         
-        # Set up headers
-        request_headers = {"Content-Type": "application/json"}
-        if headers:
-            request_headers.update(headers)
-        if token:
-            request_headers["Authorization"] = f"Bearer {token}"
+        # Content-Type is a session default; requests merges these per-call headers over it
+        request_headers = self._headers_for(token) if not headers else {**self._headers_for(token), **headers}
+            
+        send = self._method_map.get(method.upper())
+        if send is None:
+            raise ValueError(f"Unsupported HTTP method: {method}")
             
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url, headers=request_headers)
-            elif method.upper() == "POST":
-                response = self.session.post(url, json=data, headers=request_headers)
-            elif method.upper() == "PUT":
-                response = self.session.put(url, json=data, headers=request_headers)
-            elif method.upper() == "DELETE":
-                response = self.session.delete(url, headers=request_headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-                
-            return response
+            body = orjson.dumps(data) if data is not None else None
+            response = send(url, data=body, headers=request_headers, timeout=TIMEOUT)
         except requests.exceptions.RequestException as e:
             self.log(f"Request failed: {e}", "ERROR")
             raise
             
+        if self.debug:
+            self.log(f"{method.upper()} {endpoint} -> {response.status_code}: {response.text}", "DEBUG")
+        return response
+            
+    @staticmethod
+    def _json(response: requests.Response) -> Any:
+        """Decode a JSON response body with orjson"""
+        return orjson.loads(response.content)
+        
+    def close(self):
+        """Release the pooled connections"""
+        self.session.close()
+        
     def test_health_check(self) -> bool:
         """Test basic health check endpoints"""
         self.log("Testing health check endpoints...")
@@ -77,7 +123,7 @@ class BackendTester:
             # Test health endpoint
             response = self.make_request("GET", "/health")
             if response.status_code == 200:
-                data = response.json()
+                data = self._json(response)
                 if "status" in data and data["status"] == "healthy":
                     self.log("✅ Health check endpoint working")
                     return True
@@ -92,6 +138,29 @@ class BackendTester:
             self.log(f"❌ Health check test failed: {e}", "ERROR")
             return False
             
+    def _register_then_login(self, user_data: Dict) -> tuple:
+        """Register a single user, then immediately log in so the login overlaps other registrations"""
+        response = self.make_request("POST", "/auth/register", user_data)
+        if response.status_code == 200:
+            try:
+                self._prefetched_logins[user_data["role"]] = self.make_request("POST", "/auth/login", {
+                    "email": user_data["email"],
+                    "password": user_data["password"]
+                })
+            except requests.exceptions.RequestException:
+                pass  # test_user_login retries the login itself
+        return user_data, response
+        
+    def _login(self, login_data: Dict) -> tuple:
+        """Log in a single user, reusing the login already chained behind its registration"""
+        prefetched = self._prefetched_logins.pop(login_data["role"], None)
+        if prefetched is not None:
+            return login_data, prefetched
+        return login_data, self.make_request("POST", "/auth/login", {
+            "email": login_data["email"],
+            "password": login_data["password"]
+        })
+        
     def test_user_registration(self) -> bool:
         """Test user registration for all roles"""
         self.log("Testing user registration for all roles...")
@@ -138,30 +207,36 @@ class BackendTester:
         
         success_count = 0
         
-        for user_data in test_users:
-            try:
-                response = self.make_request("POST", "/auth/register", user_data)
-                
-                if response.status_code == 200:
-                    token_data = response.json()
-                    if all(key in token_data for key in ["access_token", "token_type", "user_id", "role"]):
-                        self.tokens[user_data["role"]] = token_data["access_token"]
-                        self.users[user_data["role"]] = {
-                            "user_id": token_data["user_id"],
-                            "email": user_data["email"],
-                            "role": user_data["role"],
-                            "full_name": user_data["full_name"]
-                        }
-                        self.log(f"✅ {user_data['role'].title()} registration successful")
-                        success_count += 1
-                    else:
-                        self.log(f"❌ {user_data['role'].title()} registration returned incomplete token data", "ERROR")
-                else:
-                    error_msg = response.text
-                    self.log(f"❌ {user_data['role'].title()} registration failed: {response.status_code} - {error_msg}", "ERROR")
+        # Registrations are independent, so issue them concurrently; each role's login follows its own registration
+        with ThreadPoolExecutor(max_workers=len(test_users)) as executor:
+            futures = {executor.submit(self._register_then_login, user_data): user_data for user_data in test_users}
+            
+            for future in as_completed(futures):
+                user_data = futures[future]
+                try:
+                    _, response = future.result()
                     
-            except Exception as e:
-                self.log(f"❌ {user_data['role'].title()} registration error: {e}", "ERROR")
+                    if response.status_code == 200:
+                        token_data = self._json(response)
+                        if all(key in token_data for key in ["access_token", "token_type", "user_id", "role"]):
+                            with self._state_lock:
+                                self._store_token(user_data["role"], token_data["access_token"])
+                                self.users[user_data["role"]] = {
+                                    "user_id": token_data["user_id"],
+                                    "email": user_data["email"],
+                                    "role": user_data["role"],
+                                    "full_name": user_data["full_name"]
+                                }
+                            self.log(f"✅ {user_data['role'].title()} registration successful")
+                            success_count += 1
+                        else:
+                            self.log(f"❌ {user_data['role'].title()} registration returned incomplete token data", "ERROR")
+                    else:
+                        error_msg = response.text
+                        self.log(f"❌ {user_data['role'].title()} registration failed: {response.status_code} - {error_msg}", "ERROR")
+                        
+                except Exception as e:
+                    self.log(f"❌ {user_data['role'].title()} registration error: {e}", "ERROR")
                 
         return success_count == len(test_users)
         
@@ -195,34 +270,37 @@ class BackendTester:
         
         success_count = 0
         
-        for login_data in login_tests:
-            try:
-                response = self.make_request("POST", "/auth/login", {
-                    "email": login_data["email"],
-                    "password": login_data["password"]
-                })
-                
-                if response.status_code == 200:
-                    token_data = response.json()
-                    if token_data.get("role") == login_data["role"]:
-                        # Store token for later tests if not already stored
-                        if login_data["role"] not in self.tokens:
-                            self.tokens[login_data["role"]] = token_data["access_token"]
-                            self.users[login_data["role"]] = {
-                                "user_id": token_data["user_id"],
-                                "email": login_data["email"],
-                                "role": login_data["role"],
-                                "full_name": "Test User"
-                            }
-                        self.log(f"✅ {login_data['role'].title()} login successful")
-                        success_count += 1
-                    else:
-                        self.log(f"❌ {login_data['role'].title()} login returned wrong role", "ERROR")
-                else:
-                    self.log(f"❌ {login_data['role'].title()} login failed: {response.status_code}", "ERROR")
+        # Logins are independent, so issue them concurrently
+        with ThreadPoolExecutor(max_workers=len(login_tests)) as executor:
+            futures = {executor.submit(self._login, login_data): login_data for login_data in login_tests}
+            
+            for future in as_completed(futures):
+                login_data = futures[future]
+                try:
+                    _, response = future.result()
                     
-            except Exception as e:
-                self.log(f"❌ {login_data['role'].title()} login error: {e}", "ERROR")
+                    if response.status_code == 200:
+                        token_data = self._json(response)
+                        if token_data.get("role") == login_data["role"]:
+                            # Store token for later tests if not already stored
+                            with self._state_lock:
+                                if login_data["role"] not in self.tokens:
+                                    self._store_token(login_data["role"], token_data["access_token"])
+                                    self.users[login_data["role"]] = {
+                                        "user_id": token_data["user_id"],
+                                        "email": login_data["email"],
+                                        "role": login_data["role"],
+                                        "full_name": "Test User"
+                                    }
+                            self.log(f"✅ {login_data['role'].title()} login successful")
+                            success_count += 1
+                        else:
+                            self.log(f"❌ {login_data['role'].title()} login returned wrong role", "ERROR")
+                    else:
+                        self.log(f"❌ {login_data['role'].title()} login failed: {response.status_code}", "ERROR")
+                        
+                except Exception as e:
+                    self.log(f"❌ {login_data['role'].title()} login error: {e}", "ERROR")
                 
         # Test invalid credentials
         try:
@@ -245,10 +323,20 @@ class BackendTester:
         self.log("Testing protected routes and JWT validation...")
         
         success_count = 0
+        patient_token = self.tokens.get("patient")
+        
+        # The three checks are independent, so send them together
+        no_token_result, invalid_token_result, valid_token_result = self.gather(
+            lambda: self.make_request("GET", "/users/me"),
+            lambda: self.make_request("GET", "/users/me", token="invalid_token"),
+            lambda: self.make_request("GET", "/users/me", token=patient_token) if patient_token else None
+        )
         
         # Test accessing protected route without token
         try:
-            response = self.make_request("GET", "/users/me")
+            response = no_token_result
+            if isinstance(response, Exception):
+                raise response
             if response.status_code in [401, 403]:  # FastAPI HTTPBearer can return either
                 self.log("✅ Protected route properly rejects requests without token")
                 success_count += 1
@@ -259,7 +347,9 @@ class BackendTester:
             
         # Test accessing protected route with invalid token
         try:
-            response = self.make_request("GET", "/users/me", token="invalid_token")
+            response = invalid_token_result
+            if isinstance(response, Exception):
+                raise response
             if response.status_code == 401:
                 self.log("✅ Protected route properly rejects invalid tokens")
                 success_count += 1
@@ -269,11 +359,13 @@ class BackendTester:
             self.log(f"❌ Invalid token test error: {e}", "ERROR")
             
         # Test accessing protected route with valid token
-        if "patient" in self.tokens:
+        if patient_token:
             try:
-                response = self.make_request("GET", "/users/me", token=self.tokens["patient"])
+                response = valid_token_result
+                if isinstance(response, Exception):
+                    raise response
                 if response.status_code == 200:
-                    user_data = response.json()
+                    user_data = self._json(response)
                     if user_data.get("role") == "patient":
                         self.log("✅ Protected route works with valid token")
                         success_count += 1
@@ -293,29 +385,41 @@ class BackendTester:
         self.log("Testing user management endpoints...")
         
         success_count = 0
+        roles = [role for role in ["patient", "gp", "pharmacy", "delegate"] if role in self.tokens]
+        
+        # All six lookups are independent, so fan them out together
+        results = self.gather(
+            *[lambda token=self.tokens[role]: self.make_request("GET", "/users/me", token=token) for role in roles],
+            lambda: self.make_request("GET", "/users/gps"),
+            lambda: self.make_request("GET", "/users/pharmacies")
+        )
+        me_results = results[:len(roles)]
+        gps_result, pharmacies_result = results[len(roles):]
         
         # Test get current user info for each role
-        for role in ["patient", "gp", "pharmacy", "delegate"]:
-            if role in self.tokens:
-                try:
-                    response = self.make_request("GET", "/users/me", token=self.tokens[role])
-                    if response.status_code == 200:
-                        user_data = response.json()
-                        if user_data.get("role") == role:
-                            self.log(f"✅ Get current user info works for {role}")
-                            success_count += 1
-                        else:
-                            self.log(f"❌ Wrong role returned for {role}", "ERROR")
+        for role, response in zip(roles, me_results):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                if response.status_code == 200:
+                    user_data = self._json(response)
+                    if user_data.get("role") == role:
+                        self.log(f"✅ Get current user info works for {role}")
+                        success_count += 1
                     else:
-                        self.log(f"❌ Get current user failed for {role}: {response.status_code}", "ERROR")
-                except Exception as e:
-                    self.log(f"❌ Get current user error for {role}: {e}", "ERROR")
+                        self.log(f"❌ Wrong role returned for {role}", "ERROR")
+                else:
+                    self.log(f"❌ Get current user failed for {role}: {response.status_code}", "ERROR")
+            except Exception as e:
+                self.log(f"❌ Get current user error for {role}: {e}", "ERROR")
                     
         # Test get GPs list
         try:
-            response = self.make_request("GET", "/users/gps")
+            response = gps_result
+            if isinstance(response, Exception):
+                raise response
             if response.status_code == 200:
-                gps = response.json()
+                gps = self._json(response)
                 if isinstance(gps, list) and len(gps) > 0:
                     self.log("✅ Get GPs list working")
                     success_count += 1
@@ -328,9 +432,11 @@ class BackendTester:
             
         # Test get pharmacies list
         try:
-            response = self.make_request("GET", "/users/pharmacies")
+            response = pharmacies_result
+            if isinstance(response, Exception):
+                raise response
             if response.status_code == 200:
-                pharmacies = response.json()
+                pharmacies = self._json(response)
                 if isinstance(pharmacies, list) and len(pharmacies) > 0:
                     self.log("✅ Get pharmacies list working")
                     success_count += 1
@@ -362,7 +468,7 @@ class BackendTester:
             try:
                 response = self.make_request("POST", "/prescriptions", prescription_data, token=self.tokens["patient"])
                 if response.status_code == 200:
-                    prescription = response.json()
+                    prescription = self._json(response)
                     if prescription.get("status") == "requested":
                         self.prescriptions["test_prescription"] = prescription
                         self.log("✅ Patient can create prescription")
@@ -377,12 +483,20 @@ class BackendTester:
             self.log("❌ No patient token available", "ERROR")
             
         # Step 2: Test role-based prescription access
+        # The list reads don't depend on each other, so fetch them together before the next mutation
+        patient_list_result, gp_list_result = self.gather(
+            lambda: self.make_request("GET", "/prescriptions", token=self.tokens["patient"]) if "patient" in self.tokens else None,
+            lambda: self.make_request("GET", "/prescriptions", token=self.tokens["gp"]) if "gp" in self.tokens else None
+        )
+        
         # Patient should see their prescriptions
         if "patient" in self.tokens:
             try:
-                response = self.make_request("GET", "/prescriptions", token=self.tokens["patient"])
+                response = patient_list_result
+                if isinstance(response, Exception):
+                    raise response
                 if response.status_code == 200:
-                    prescriptions = response.json()
+                    prescriptions = self._json(response)
                     if isinstance(prescriptions, list) and len(prescriptions) > 0:
                         self.log("✅ Patient can view their prescriptions")
                         success_count += 1
@@ -396,9 +510,11 @@ class BackendTester:
         # GP should see pending prescriptions
         if "gp" in self.tokens:
             try:
-                response = self.make_request("GET", "/prescriptions", token=self.tokens["gp"])
+                response = gp_list_result
+                if isinstance(response, Exception):
+                    raise response
                 if response.status_code == 200:
-                    prescriptions = response.json()
+                    prescriptions = self._json(response)
                     if isinstance(prescriptions, list):
                         self.log("✅ GP can view pending prescriptions")
                         success_count += 1
@@ -420,7 +536,7 @@ class BackendTester:
             try:
                 response = self.make_request("PUT", f"/prescriptions/{prescription_id}", update_data, token=self.tokens["gp"])
                 if response.status_code == 200:
-                    updated_prescription = response.json()
+                    updated_prescription = self._json(response)
                     if updated_prescription.get("status") == "gp_approved":
                         self.prescriptions["test_prescription"] = updated_prescription
                         self.log("✅ GP can approve prescription")
@@ -432,12 +548,21 @@ class BackendTester:
             except Exception as e:
                 self.log(f"❌ GP prescription approval error: {e}", "ERROR")
                 
+        # Steps 4 and 5 are independent reads, so fetch them together before fulfilment
+        prescription_id = self.prescriptions.get("test_prescription", {}).get("id")
+        pharmacy_list_result, individual_result = self.gather(
+            lambda: self.make_request("GET", "/prescriptions", token=self.tokens["pharmacy"]) if "pharmacy" in self.tokens else None,
+            lambda: self.make_request("GET", f"/prescriptions/{prescription_id}", token=self.tokens["patient"]) if "patient" in self.tokens and prescription_id else None
+        )
+        
         # Step 4: Pharmacy sees approved prescriptions
         if "pharmacy" in self.tokens:
             try:
-                response = self.make_request("GET", "/prescriptions", token=self.tokens["pharmacy"])
+                response = pharmacy_list_result
+                if isinstance(response, Exception):
+                    raise response
                 if response.status_code == 200:
-                    prescriptions = response.json()
+                    prescriptions = self._json(response)
                     if isinstance(prescriptions, list):
                         self.log("✅ Pharmacy can view approved prescriptions")
                         success_count += 1
@@ -448,7 +573,26 @@ class BackendTester:
             except Exception as e:
                 self.log(f"❌ Pharmacy prescription list error: {e}", "ERROR")
                 
-        # Step 5: Pharmacy fulfills prescription
+        # Step 5: Test individual prescription access
+        if "patient" in self.tokens and "test_prescription" in self.prescriptions:
+            prescription_id = self.prescriptions["test_prescription"]["id"]
+            try:
+                response = individual_result
+                if isinstance(response, Exception):
+                    raise response
+                if response.status_code == 200:
+                    prescription = self._json(response)
+                    if prescription.get("id") == prescription_id:
+                        self.log("✅ Individual prescription access working")
+                        success_count += 1
+                    else:
+                        self.log("❌ Individual prescription returned wrong data", "ERROR")
+                else:
+                    self.log(f"❌ Individual prescription access failed: {response.status_code}", "ERROR")
+            except Exception as e:
+                self.log(f"❌ Individual prescription access error: {e}", "ERROR")
+                
+        # Step 6: Pharmacy fulfills prescription
         if "pharmacy" in self.tokens and "test_prescription" in self.prescriptions:
             prescription_id = self.prescriptions["test_prescription"]["id"]
             update_data = {
@@ -459,7 +603,7 @@ class BackendTester:
             try:
                 response = self.make_request("PUT", f"/prescriptions/{prescription_id}", update_data, token=self.tokens["pharmacy"])
                 if response.status_code == 200:
-                    updated_prescription = response.json()
+                    updated_prescription = self._json(response)
                     if updated_prescription.get("status") == "pharmacy_fulfilled":
                         self.log("✅ Pharmacy can fulfill prescription")
                         success_count += 1
@@ -470,23 +614,6 @@ class BackendTester:
             except Exception as e:
                 self.log(f"❌ Pharmacy prescription fulfillment error: {e}", "ERROR")
                 
-        # Step 6: Test individual prescription access
-        if "patient" in self.tokens and "test_prescription" in self.prescriptions:
-            prescription_id = self.prescriptions["test_prescription"]["id"]
-            try:
-                response = self.make_request("GET", f"/prescriptions/{prescription_id}", token=self.tokens["patient"])
-                if response.status_code == 200:
-                    prescription = response.json()
-                    if prescription.get("id") == prescription_id:
-                        self.log("✅ Individual prescription access working")
-                        success_count += 1
-                    else:
-                        self.log("❌ Individual prescription returned wrong data", "ERROR")
-                else:
-                    self.log(f"❌ Individual prescription access failed: {response.status_code}", "ERROR")
-            except Exception as e:
-                self.log(f"❌ Individual prescription access error: {e}", "ERROR")
-                
         return success_count >= 6  # Allow some flexibility for workflow steps
         
     def test_delegation_system(self) -> bool:
@@ -507,7 +634,7 @@ class BackendTester:
             try:
                 response = self.make_request("POST", "/delegations", delegation_data, token=self.tokens["patient"])
                 if response.status_code == 200:
-                    delegation = response.json()
+                    delegation = self._json(response)
                     if delegation.get("status") == "pending":
                         self.delegations["test_delegation"] = delegation
                         self.log("✅ Patient can create delegation")
@@ -526,7 +653,7 @@ class BackendTester:
             try:
                 response = self.make_request("GET", "/delegations", token=self.tokens["patient"])
                 if response.status_code == 200:
-                    delegations = response.json()
+                    delegations = self._json(response)
                     if isinstance(delegations, list):
                         self.log("✅ Patient can view their delegations")
                         success_count += 1
@@ -542,7 +669,7 @@ class BackendTester:
             try:
                 response = self.make_request("GET", "/delegations", token=self.tokens["delegate"])
                 if response.status_code == 200:
-                    delegations = response.json()
+                    delegations = self._json(response)
                     if isinstance(delegations, list):
                         self.log("✅ Delegate can view their delegations")
                         success_count += 1
@@ -559,7 +686,7 @@ class BackendTester:
             try:
                 response = self.make_request("PUT", f"/delegations/{delegation_id}/approve", token=self.tokens["patient"])
                 if response.status_code == 200:
-                    result = response.json()
+                    result = self._json(response)
                     if "message" in result:
                         self.log("✅ Patient can approve delegation")
                         success_count += 1
@@ -572,6 +699,24 @@ class BackendTester:
                 
         return success_count >= 3  # Allow some flexibility
         
+    def test_notification_system(self) -> bool:
+        """Test notification retrieval"""
+        self.log("Testing notification system...")
+        
+        if "patient" not in self.tokens:
+            self.log("❌ No patient token available for notification test", "ERROR")
+            return False
+            
+        try:
+            response = self.make_request("GET", "/notifications", token=self.tokens["patient"])
+            if response.status_code == 200 and isinstance(self._json(response), list):
+                self.log("✅ Patient can view their notifications")
+                return True
+            self.log(f"❌ Notification retrieval failed: {response.status_code}", "ERROR")
+        except Exception as e:
+            self.log(f"❌ Notification retrieval error: {e}", "ERROR")
+        return False
+        
     def test_role_based_access_control(self) -> bool:
         """Test role-based access control"""
         self.log("Testing role-based access control...")
@@ -626,54 +771,72 @@ class BackendTester:
         
         test_results = {}
         
-        # Test 1: Health Check
-        test_results["health_check"] = self.test_health_check()
-        
-        # Test 2: User Registration
-        test_results["user_registration"] = self.test_user_registration()
-        
-        # Test 3: User Login
-        test_results["user_login"] = self.test_user_login()
-        
-        # Test 4: Protected Routes & JWT
-        test_results["protected_routes"] = self.test_protected_routes()
-        
-        # Test 5: User Management
-        test_results["user_management"] = self.test_user_management()
-        
-        # Test 6: Prescription Workflow
-        test_results["prescription_workflow"] = self.test_prescription_workflow()
-        
-        # Test 7: Delegation System
-        test_results["delegation_system"] = self.test_delegation_system()
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            # Test 1: Health Check has no dependencies, so it runs alongside authentication
+            health_future = executor.submit(self.test_health_check)
+            
+            # Tests 2-3: User Registration, then Login (login reuses the registered users)
+            test_results["user_registration"] = self.test_user_registration()
+            test_results["user_login"] = self.test_user_login()
+            
+            # Tests 4-8 only read the tokens/users populated above and each writes its own
+            # records (prescriptions and delegations are stored in separate dicts), so they all run together
+            independent_futures = {
+                executor.submit(self.test_protected_routes): "protected_routes",
+                executor.submit(self.test_user_management): "user_management",
+                executor.submit(self.test_prescription_workflow): "prescription_workflow",
+                executor.submit(self.test_delegation_system): "delegation_system",
+                executor.submit(self.test_role_based_access_control): "role_based_access"
+            }
+            test_results["health_check"] = health_future.result()
+            for future in as_completed(independent_futures):
+                test_results[independent_futures[future]] = future.result()
+                
         
-        # Test 8: Role-based Access Control
-        test_results["role_based_access"] = self.test_role_based_access_control()
+        # Report in the canonical test order regardless of completion order
+        test_order = ["health_check", "user_registration", "user_login", "protected_routes",
+                      "user_management", "prescription_workflow", "delegation_system", "role_based_access"]
+        test_results = {name: test_results[name] for name in test_order}
         
-        # Summary
-        self.log("=" * 60)
-        self.log("TEST RESULTS SUMMARY")
-        self.log("=" * 60)
-        
-        passed = 0
+        # Summary, formatted as an aligned table and emitted as a single write
+        passed = sum(1 for result in test_results.values() if result)
         total = len(test_results)
         
-        for test_name, result in test_results.items():
-            status = "✅ PASS" if result else "❌ FAIL"
-            self.log(f"{test_name.replace('_', ' ').title()}: {status}")
-            if result:
-                passed += 1
-                
-        self.log("=" * 60)
-        self.log(f"OVERALL RESULT: {passed}/{total} tests passed")
-        
+        banner = "=" * 60
+        body = "\n".join(f"{test_name.replace('_', ' ').title():<45} {'✅ PASS' if result else '❌ FAIL'}"
+                         for test_name, result in test_results.items())
         if passed == total:
-            self.log("🎉 ALL TESTS PASSED! Backend system is working correctly.")
+            verdict = "🎉 ALL TESTS PASSED! Backend system is working correctly."
         else:
-            self.log(f"⚠️  {total - passed} tests failed. Please check the logs above for details.")
+            verdict = f"⚠️  {total - passed} tests failed. Please check the logs above for details."
+        sys.stdout.write(f"{banner}\nTEST RESULTS SUMMARY\n{banner}\n{body}\n{banner}\n"
+                         f"OVERALL RESULT: {passed}/{total} tests passed\n{verdict}\n")
             
         return test_results
 
+    def run_debug(self, name: str) -> bool:
+        """Authenticate the test users, then run a single test with every response logged"""
+        debug_tests = {
+            "prescription": self.test_prescription_workflow,
+            "notification": self.test_notification_system,
+            "delegation": self.test_delegation_system
+        }
+        self.test_user_registration()
+        self.test_user_login()
+        self.debug = True
+        return debug_tests[name]()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PMA backend tests")
+    parser.add_argument("--debug", choices=["prescription", "notification", "delegation"],
+                        help="run a single test and log every response body")
+    args = parser.parse_args()
+    
     tester = BackendTester()
-    results = tester.run_all_tests()
\ No newline at end of file
+    try:
+        if args.debug:
+            passed = tester.run_debug(args.debug)
+            sys.exit(0 if passed else 1)
+        results = tester.run_all_tests()
+    finally:
+        tester.close()
\ No newline at end of file
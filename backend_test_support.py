@@ -0,0 +1,85 @@
+"""
+Shared plumbing for the backend test scripts (backend_test.py, enhanced_backend_test.py,
+enhanced_features_test.py): TLS connection pooling, auth headers and request fan-out
+"""
+
+import os
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import certifi
+from requests.adapters import HTTPAdapter
+
+# Fields the analytics dashboard response must carry
+ANALYTICS_FIELDS = frozenset({"total_prescriptions", "pending_prescriptions", "approved_prescriptions",
+                              "dispensed_prescriptions", "completion_rate"})
+
+# One worker pool per process for running independent requests concurrently
+_executor = ThreadPoolExecutor(max_workers=16)
+
+# One TLS context shared by every pooled HTTPS connection in this process. It trusts the same CA
+# bundle requests would pick (REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE, else certifi), loaded once here
+# rather than per connection. urllib3 only speaks HTTP/1.1, so that is the only protocol offered via ALPN.
+_CA_BUNDLE = os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get("CURL_CA_BUNDLE") or certifi.where()
+if os.path.isdir(_CA_BUNDLE):
+    _SSL_CTX = ssl.create_default_context(capath=_CA_BUNDLE)
+else:
+    _SSL_CTX = ssl.create_default_context(cafile=_CA_BUNDLE)
+_SSL_CTX.set_alpn_protocols(["http/1.1"])
+
+class SharedTLSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools all reuse the module-level SSL context.
+
+    When a request verifies against the bundle already loaded into that context, the CA path is
+    dropped from the pool settings, otherwise urllib3 reloads it into the shared context for every
+    new connection. Pools for any other verify value get their own context, so the shared one is
+    never modified.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _SSL_CTX
+        return super().init_poolmanager(*args, **kwargs)
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if verify == _CA_BUNDLE:
+            pool_kwargs.pop("ca_certs", None)
+            pool_kwargs.pop("ca_cert_dir", None)
+        elif verify is not True:
+            pool_kwargs["ssl_context"] = None
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if (verify is True or verify == _CA_BUNDLE) and conn.conn_kw.get("ssl_context") is _SSL_CTX:
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+class TesterMixin:
+    """Token bookkeeping and request fan-out shared by the testers.
+
+    Expects self.tokens (role -> token) and self._header_cache to be set up in the tester's __init__.
+    """
+    def _store_token(self, role: str, token: str):
+        """Remember a role's token and build its Authorization header once, at the point it is issued"""
+        self.tokens[role] = token
+        self._header_cache[token] = {"Authorization": f"Bearer {token}"}
+
+    def _headers_for(self, token: Optional[str]) -> Dict[str, str]:
+        """Return the (shared, read-only) header dict for a token, building it on first use"""
+        cached = self._header_cache.get(token)
+        if cached is None:
+            cached = {"Authorization": f"Bearer {token}"} if token else {}
+            self._header_cache[token] = cached
+        return cached
+
+    def gather(self, *calls) -> List[Any]:
+        """Run independent request callables concurrently, returning results (or raised exceptions) in order"""
+        futures = [_executor.submit(call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
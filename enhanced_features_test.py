@@ -5,54 +5,145 @@ Tests notification system, analytics dashboard, and audit features
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import asyncio
+import orjson
+import queue
+import threading
 import time
-from datetime import datetime
-from typing import Dict, Any
+import websockets
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+
+from backend_test_support import ANALYTICS_FIELDS
 
 # Configuration
 BASE_URL = "https://ab6009e8-2e3e-4cd0-b3b8-a452a86b19f9.preview.emergentagent.com/api"
 TIMEOUT = 30
+WS_NOTIFICATIONS_URL = BASE_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/ws/notifications"
+WS_CONNECT_TIMEOUT = 5
 
 class EnhancedFeaturesTester:
     def __init__(self):
         self.base_url = BASE_URL
         self.session = requests.Session()
-        self.session.timeout = TIMEOUT
+        # Keep-alive pool for the single test host, so only the first request pays for TCP/TLS setup
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=50, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
         self.tokens = {}
+        self.auth_headers = {}  # Prebuilt Authorization header dict per role, set once in setup
         self.users = {}
+        self._log_lock = threading.Lock()  # Keeps lines intact when test groups log from several threads
+        self.notif_queues: Dict[str, queue.Queue] = {}  # Pushed notification events per subscribed role
         
     def log(self, message: str, level: str = "INFO"):
         """Log test messages with timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        timestamp = time.strftime("%H:%M:%S")
+        with self._log_lock:
+            print(f"[{timestamp}] {level}: {message}")
         
     def make_request(self, method: str, endpoint: str, data: Dict = None, 
-                    headers: Dict = None, token: str = None) -> requests.Response:
-        """Make HTTP request with proper error handling"""
+                    headers: Dict = None, auth_headers: Dict = None,
+                    raw_body: Optional[bytes] = None) -> requests.Response:
+        """Make HTTP request with proper error handling (raw_body sends pre-encoded JSON instead of data)"""
         url = f"{self.base_url}{endpoint}"
         
-        request_headers = {"Content-Type": "application/json"}
-        if headers:
-            request_headers.update(headers)
-        if token:
-            request_headers["Authorization"] = f"Bearer {token}"
+        # Content-Type is a session default; auth_headers is a prebuilt per-role dict passed straight through
+        request_headers = auth_headers if not headers else {**(auth_headers or {}), **headers}
+            
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
             
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url, headers=request_headers)
-            elif method.upper() == "POST":
-                response = self.session.post(url, json=data, headers=request_headers)
-            elif method.upper() == "PUT":
-                response = self.session.put(url, json=data, headers=request_headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-                
-            return response
+            # TIMEOUT must be passed per call; requests ignores a timeout attribute on the session
+            if raw_body is not None:
+                return self.session.request(method, url, data=raw_body,
+                                            headers=request_headers, timeout=TIMEOUT, stream=False)
+            return self.session.request(method, url, json=(data if method != "GET" else None),
+                                        headers=request_headers, timeout=TIMEOUT, stream=False)
         except requests.exceptions.RequestException as e:
             self.log(f"Request failed: {e}", "ERROR")
             raise
             
+    def _register_user(self, user_data: Dict, body: bytes) -> tuple:
+        """Register one test user from its pre-encoded body, returning the payload alongside the response or raised error"""
+        try:
+            return user_data, self.make_request("POST", "/auth/register", raw_body=body)
+        except Exception as e:
+            return user_data, e
+            
+    @staticmethod
+    def _ok_json(response: requests.Response) -> Any:
+        """Decode the body of a 200 response exactly once; None for any other status (body left unparsed)"""
+        return response.json() if response.status_code == 200 else None
+        
+    def _poll_notifications(self, auth_headers: Dict, timeout: float = 2.0, interval: float = 0.05) -> tuple:
+        """Poll /notifications until it returns at least one item or the timeout passes.
+        
+        Returns the last response and its notifications (empty when none arrived or the request failed).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            response = self.make_request("GET", "/notifications", auth_headers=auth_headers)
+            notifications = self._ok_json(response) or []
+            if notifications or time.monotonic() >= deadline:
+                return response, notifications
+            time.sleep(interval)
+            
+    def subscribe_notifications(self, role: str) -> bool:
+        """Open a background WebSocket subscription for a role's pushed notifications.
+        
+        Events are put on self.notif_queues[role]. Returns False (leaving tests on the HTTP poll path)
+        when the handshake fails, e.g. against a backend without the /ws/notifications endpoint.
+        """
+        events: queue.Queue = queue.Queue()
+        connected = threading.Event()
+        settled = threading.Event()  # Set as soon as the handshake has either succeeded or failed
+        
+        async def listen():
+            async with websockets.connect(WS_NOTIFICATIONS_URL,
+                                          extra_headers=self.auth_headers[role],
+                                          open_timeout=WS_CONNECT_TIMEOUT) as ws:
+                connected.set()
+                settled.set()
+                async for message in ws:
+                    events.put(orjson.loads(message))
+                    
+        def run():
+            try:
+                asyncio.run(listen())
+            except Exception as e:
+                if not connected.is_set():
+                    self.log(f"Notification WebSocket unavailable for {role}, falling back to polling: {e}", "WARNING")
+            finally:
+                settled.set()
+                    
+        threading.Thread(target=run, name=f"notifications-{role}", daemon=True).start()
+        settled.wait(WS_CONNECT_TIMEOUT + 1)
+        if not connected.is_set():
+            return False
+        self.notif_queues[role] = events
+        return True
+        
+    def _await_pushed_notification(self, role: str, prescription_id: str, timeout: float = 2.0):
+        """Wait for a pushed notification about a prescription; None if unsubscribed or nothing arrives in time"""
+        events = self.notif_queues.get(role)
+        if events is None:
+            return None
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            notification = event.get("data") or {}
+            if event.get("type") == "notification" and notification.get("prescription_id") == prescription_id:
+                return notification
+        return None
+        
     def setup_test_users(self) -> bool:
         """Set up test users for enhanced features testing"""
         self.log("Setting up test users...")
@@ -91,13 +182,24 @@ class EnhancedFeaturesTester:
         
         success_count = 0
         
-        for user_data in test_users:
+        # Encode each registration once up front; only the bytes are sent
+        payloads = [(user_data, orjson.dumps(user_data)) for user_data in test_users]
+        
+        # Registrations are independent, so send them concurrently; tokens/users are recorded
+        # here on the calling thread, so no locking is needed
+        with ThreadPoolExecutor(max_workers=len(test_users)) as executor:
+            futures = [executor.submit(self._register_user, user_data, body) for user_data, body in payloads]
+            results = [future.result() for future in as_completed(futures)]
+            
+        for user_data, response in results:
             try:
-                response = self.make_request("POST", "/auth/register", user_data)
-                
-                if response.status_code == 200:
-                    token_data = response.json()
+                if isinstance(response, Exception):
+                    raise response
+                    
+                token_data = self._ok_json(response)
+                if token_data is not None:
                     self.tokens[user_data["role"]] = token_data["access_token"]
+                    self.auth_headers[user_data["role"]] = {"Authorization": f"Bearer {token_data['access_token']}"}
                     self.users[user_data["role"]] = {
                         "user_id": token_data["user_id"],
                         "email": user_data["email"],
@@ -112,6 +214,10 @@ class EnhancedFeaturesTester:
             except Exception as e:
                 self.log(f"❌ {user_data['role'].title()} user setup error: {e}", "ERROR")
                 
+        # Subscribe once to the patient's pushed notifications; tests fall back to polling without it
+        if "patient" in self.auth_headers and self.subscribe_notifications("patient"):
+            self.log("✅ Subscribed to patient notifications over WebSocket")
+                
         return success_count == len(test_users)
         
     def test_notification_system(self) -> bool:
@@ -123,9 +229,9 @@ class EnhancedFeaturesTester:
         # Test 1: Get notifications for patient
         if "patient" in self.tokens:
             try:
-                response = self.make_request("GET", "/notifications", token=self.tokens["patient"])
-                if response.status_code == 200:
-                    notifications = response.json()
+                response = self.make_request("GET", "/notifications", auth_headers=self.auth_headers["patient"])
+                notifications = self._ok_json(response)
+                if notifications is not None:
                     if isinstance(notifications, list):
                         self.log("✅ Notification retrieval working")
                         success_count += 1
@@ -147,34 +253,38 @@ class EnhancedFeaturesTester:
             }
             
             try:
-                response = self.make_request("POST", "/prescriptions", prescription_data, token=self.tokens["patient"])
-                if response.status_code == 200:
+                response = self.make_request("POST", "/prescriptions", prescription_data, auth_headers=self.auth_headers["patient"])
+                prescription = self._ok_json(response)
+                if prescription is not None:
                     self.log("✅ Prescription created for notification testing")
                     success_count += 1
                     
-                    # Wait a moment for notification to be created
-                    time.sleep(1)
-                    
-                    # Check if notification was created
-                    response = self.make_request("GET", "/notifications", token=self.tokens["patient"])
-                    if response.status_code == 200:
-                        notifications = response.json()
-                        if len(notifications) > 0:
-                            self.log("✅ Notification created after prescription submission")
-                            success_count += 1
-                            
-                            # Test marking notification as read
+                    # Prefer the notification pushed over the WebSocket subscription; without one, poll
+                    # /notifications until it shows up rather than sleeping a fixed second
+                    notification_id = None
+                    pushed = self._await_pushed_notification("patient", prescription["id"])
+                    if pushed is not None:
+                        notification_id = pushed["id"]
+                    else:
+                        response, notifications = self._poll_notifications(self.auth_headers["patient"])
+                        if response.status_code != 200:
+                            self.log(f"❌ Failed to retrieve notifications after prescription: {response.status_code}", "ERROR")
+                        elif len(notifications) > 0:
                             notification_id = notifications[0]["id"]
-                            response = self.make_request("PUT", f"/notifications/{notification_id}/read", token=self.tokens["patient"])
-                            if response.status_code == 200:
-                                self.log("✅ Notification mark-as-read working")
-                                success_count += 1
-                            else:
-                                self.log(f"❌ Notification mark-as-read failed: {response.status_code}", "ERROR")
                         else:
                             self.log("❌ No notifications found after prescription creation", "ERROR")
-                    else:
-                        self.log(f"❌ Failed to retrieve notifications after prescription: {response.status_code}", "ERROR")
+                            
+                    if notification_id is not None:
+                        self.log("✅ Notification created after prescription submission")
+                        success_count += 1
+                        
+                        # Test marking notification as read
+                        response = self.make_request("PUT", f"/notifications/{notification_id}/read", auth_headers=self.auth_headers["patient"])
+                        if response.status_code == 200:
+                            self.log("✅ Notification mark-as-read working")
+                            success_count += 1
+                        else:
+                            self.log(f"❌ Notification mark-as-read failed: {response.status_code}", "ERROR")
                 else:
                     self.log(f"❌ Prescription creation for notification test failed: {response.status_code}", "ERROR")
             except Exception as e:
@@ -188,44 +298,29 @@ class EnhancedFeaturesTester:
         
         success_count = 0
         
-        # Test 1: GP access to analytics
-        if "gp" in self.tokens:
-            try:
-                response = self.make_request("GET", "/analytics/dashboard", token=self.tokens["gp"])
-                if response.status_code == 200:
-                    analytics = response.json()
-                    required_fields = ["total_prescriptions", "pending_prescriptions", "approved_prescriptions", "dispensed_prescriptions", "completion_rate"]
-                    if all(field in analytics for field in required_fields):
-                        self.log("✅ GP analytics dashboard working with all required fields")
-                        success_count += 1
-                    else:
-                        self.log(f"❌ GP analytics missing required fields: {analytics}", "ERROR")
-                else:
-                    self.log(f"❌ GP analytics dashboard failed: {response.status_code}", "ERROR")
-            except Exception as e:
-                self.log(f"❌ GP analytics dashboard error: {e}", "ERROR")
-        
-        # Test 2: Pharmacy access to analytics
-        if "pharmacy" in self.tokens:
+        # Tests 1-2: GP and Pharmacy access to analytics
+        for role in ("gp", "pharmacy"):
+            if role not in self.tokens:
+                continue
+            label = "GP" if role == "gp" else role.title()
             try:
-                response = self.make_request("GET", "/analytics/dashboard", token=self.tokens["pharmacy"])
-                if response.status_code == 200:
-                    analytics = response.json()
-                    required_fields = ["total_prescriptions", "pending_prescriptions", "approved_prescriptions", "dispensed_prescriptions", "completion_rate"]
-                    if all(field in analytics for field in required_fields):
-                        self.log("✅ Pharmacy analytics dashboard working with all required fields")
+                response = self.make_request("GET", "/analytics/dashboard", auth_headers=self.auth_headers[role])
+                analytics = self._ok_json(response)
+                if analytics is not None:
+                    if ANALYTICS_FIELDS.issubset(analytics):
+                        self.log(f"✅ {label} analytics dashboard working with all required fields")
                         success_count += 1
                     else:
-                        self.log(f"❌ Pharmacy analytics missing required fields: {analytics}", "ERROR")
+                        self.log(f"❌ {label} analytics missing required fields: {analytics}", "ERROR")
                 else:
-                    self.log(f"❌ Pharmacy analytics dashboard failed: {response.status_code}", "ERROR")
+                    self.log(f"❌ {label} analytics dashboard failed: {response.status_code}", "ERROR")
             except Exception as e:
-                self.log(f"❌ Pharmacy analytics dashboard error: {e}", "ERROR")
+                self.log(f"❌ {label} analytics dashboard error: {e}", "ERROR")
         
         # Test 3: Patient access should be denied
         if "patient" in self.tokens:
             try:
-                response = self.make_request("GET", "/analytics/dashboard", token=self.tokens["patient"])
+                response = self.make_request("GET", "/analytics/dashboard", auth_headers=self.auth_headers["patient"])
                 if response.status_code == 403:
                     self.log("✅ Patient access to analytics properly denied")
                     success_count += 1
@@ -250,9 +345,9 @@ class EnhancedFeaturesTester:
             }
             
             try:
-                response = self.make_request("PUT", "/users/me", update_data, token=self.tokens["patient"])
-                if response.status_code == 200:
-                    result = response.json()
+                response = self.make_request("PUT", "/users/me", update_data, auth_headers=self.auth_headers["patient"])
+                result = self._ok_json(response)
+                if result is not None:
                     if "message" in result:
                         self.log("✅ User profile update working")
                         success_count += 1
@@ -280,9 +375,9 @@ class EnhancedFeaturesTester:
             }
             
             try:
-                response = self.make_request("POST", "/users/nominate-pharmacy", nomination_data, token=self.tokens["patient"])
-                if response.status_code == 200:
-                    result = response.json()
+                response = self.make_request("POST", "/users/nominate-pharmacy", nomination_data, auth_headers=self.auth_headers["patient"])
+                result = self._ok_json(response)
+                if result is not None:
                     if "message" in result:
                         self.log("✅ Pharmacy nomination working")
                         success_count += 1
@@ -303,7 +398,7 @@ class EnhancedFeaturesTester:
             }
             
             try:
-                response = self.make_request("POST", "/users/nominate-pharmacy", nomination_data, token=self.tokens["gp"])
+                response = self.make_request("POST", "/users/nominate-pharmacy", nomination_data, auth_headers=self.auth_headers["gp"])
                 if response.status_code == 403:
                     self.log("✅ Non-patients properly blocked from pharmacy nomination")
                     success_count += 1
@@ -327,11 +422,18 @@ class EnhancedFeaturesTester:
             self.log("❌ Failed to setup test users. Cannot continue with enhanced tests.", "ERROR")
             return {"setup_failed": False}
         
-        # Test enhanced features
-        test_results["notification_system"] = self.test_notification_system()
-        test_results["analytics_dashboard"] = self.test_analytics_dashboard()
-        test_results["user_profile_updates"] = self.test_user_profile_updates()
-        test_results["pharmacy_nomination"] = self.test_pharmacy_nomination()
+        # Test enhanced features; the groups hit disjoint endpoints and only read the tokens, so run them together
+        tests = {
+            "notification_system": self.test_notification_system,
+            "analytics_dashboard": self.test_analytics_dashboard,
+            "user_profile_updates": self.test_user_profile_updates,
+            "pharmacy_nomination": self.test_pharmacy_nomination
+        }
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            future_map = {executor.submit(test): name for name, test in tests.items()}
+            completed = {future_map[future]: future.result() for future in as_completed(future_map)}
+        # Report in the declared order regardless of completion order
+        test_results = {name: completed[name] for name in tests}
         
         # Summary
         self.log("=" * 60)
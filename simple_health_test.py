@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
-BASE_URL = "https://ab6009e8-2e3e-4cd0-b3b8-a452a86b19f9.preview.emergentagent.com/api"
+# Point at another deployment with PMA_BASE_URL instead of keeping per-environment copies of this script
+BASE_URL = os.environ.get("PMA_BASE_URL", "https://ab6009e8-2e3e-4cd0-b3b8-a452a86b19f9.preview.emergentagent.com/api")
 
-def simple_health_check():
+# Shared keep-alive session so repeated health checks reuse one connection
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+def simple_health_check(base_url: str = BASE_URL):
     try:
         print("Testing health endpoint...")
-        response = requests.get(f"{BASE_URL}/health", timeout=10)
+        response = SESSION.get(f"{base_url}/health", timeout=10)
         print(f"Status: {response.status_code}")
         if response.status_code == 200:
             print(f"Response: {response.json()}")
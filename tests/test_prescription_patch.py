@@ -0,0 +1,102 @@
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server
+from server import PrescriptionPatch, User, UserRole, patch_prescription
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for patch_prescription: exact-match filters on stored dicts"""
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+
+    def _match(self, query):
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())), None)
+
+    async def find_one(self, query, projection=None):
+        doc = self._match(query)
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        doc = self._match(query)
+        if doc is None:
+            return None
+        doc.update(update["$set"])
+        return dict(doc)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class FakeDatabase:
+    def __init__(self, prescriptions):
+        self.prescriptions = FakeCollection(prescriptions)
+        self.notifications = FakeCollection()
+        self.audit_logs = FakeCollection()
+
+
+def make_user(role):
+    return User(id=f"{role.value}-1", email=f"{role.value}@example.com", password_hash="x",
+                full_name=role.value.title(), role=role)
+
+
+def run_patch(monkeypatch, status, role, expected_status, new_status):
+    db = FakeDatabase([{
+        "id": "rx-1", "patient_id": "patient-1", "medication_name": "Amoxicillin 500mg",
+        "dosage": "500mg", "quantity": "21", "instructions": "Three times daily", "status": status
+    }])
+    monkeypatch.setattr(server, "db", db)
+    patch = PrescriptionPatch(expected_status=expected_status, changes={"status": new_status})
+    result = asyncio.run(patch_prescription("rx-1", patch, current_user=make_user(role), now=datetime.utcnow()))
+    return result, db.prescriptions.docs[0]
+
+
+def test_gp_approves_requested_prescription(monkeypatch):
+    result, stored = run_patch(monkeypatch, "requested", UserRole.GP, "requested", "gp_approved")
+    assert result.status == "gp_approved"
+    assert stored["gp_id"] == "gp-1"
+
+
+@pytest.mark.parametrize("status", ["gp_approved", "sent_to_pharmacy"])
+def test_pharmacy_dispenses_approved_prescription(monkeypatch, status):
+    result, stored = run_patch(monkeypatch, status, UserRole.PHARMACY, status, "dispensed")
+    assert result.status == "ready_for_collection"
+    assert stored["pharmacy_id"] == "pharmacy-1"
+
+
+def test_pharmacy_cannot_dispense_before_gp_approval(monkeypatch):
+    with pytest.raises(HTTPException) as excinfo:
+        run_patch(monkeypatch, "requested", UserRole.PHARMACY, "requested", "dispensed")
+    assert excinfo.value.status_code == 409
+
+
+@pytest.mark.parametrize("status", ["gp_approved", "ready_for_collection", "cancelled"])
+def test_gp_can_only_approve_requested_prescription(monkeypatch, status):
+    with pytest.raises(HTTPException) as excinfo:
+        run_patch(monkeypatch, status, UserRole.GP, status, "gp_approved")
+    assert excinfo.value.status_code == 409
+
+
+def test_stale_expected_status_conflicts(monkeypatch):
+    # The client saw "requested" but the prescription has moved on since
+    with pytest.raises(HTTPException) as excinfo:
+        run_patch(monkeypatch, "cancelled", UserRole.GP, "requested", "gp_approved")
+    assert excinfo.value.status_code == 409
+
+
+@pytest.mark.parametrize("role, new_status", [
+    (UserRole.PHARMACY, "gp_approved"),
+    (UserRole.GP, "dispensed"),
+    (UserRole.PATIENT, "gp_approved"),
+])
+def test_wrong_role_is_forbidden(monkeypatch, role, new_status):
+    with pytest.raises(HTTPException) as excinfo:
+        run_patch(monkeypatch, "requested", role, "requested", new_status)
+    assert excinfo.value.status_code == 403
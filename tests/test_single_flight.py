@@ -0,0 +1,62 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import SingleFlight
+
+
+def test_cancelled_waiter_does_not_fail_leader():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "stats"
+
+        leader = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await leader == "stats"
+        assert waiter.cancelled()
+        assert flight.inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.Event().wait()  # The first leader never finishes on its own
+            await asyncio.sleep(0)  # Yield like a database call would
+            return f"stats-{calls}"
+
+        leader = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.do("key", compute)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+
+        assert leader.cancelled()
+        # One waiter took over as leader and the other shared its result
+        assert results == ["stats-2", "stats-2"]
+        assert calls == 2
+        assert flight.inflight == {}
+
+    asyncio.run(scenario())